@@ -4,7 +4,7 @@ Fly Sleep Behavior Database Creator
 
 This script creates a SINGLE merged table in LONG format containing all data.
 
-Structure: data/processed/dam_data_merged.csv
+Structure: data/processed/dam_data_merged.parquet
 | datetime | monitor | channel | reading | value | fly_id | genotype | sex | treatment |
 
 Where:
@@ -18,13 +18,95 @@ Benefits:
 - Long format ideal for plotting and analysis
 - Complete information in every row
 - Easy to filter by reading type
+- Parquet output keeps column types and is much smaller/faster than CSV
+
+Usage:
+    python create_database.py [--demo]
+
+    --demo  Also print example rows for one fly at one timestamp
 """
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from datetime import datetime
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Version stamped into the metadata of every cache written below. Bump it
+# whenever the parser or the on-disk layout changes, so caches written by an
+# older version are rebuilt even when their source file is unchanged
+CACHE_LAYOUT_VERSION = '2'
+CACHE_METADATA = {'create_database_layout': CACHE_LAYOUT_VERSION}
+
+# On-disk layout of the per-monitor time_series_M*.arrow files
+# - datetime at nanosecond resolution, so sub-second timestamps are kept
+# - reading dictionary-encoded: a 1-byte code per row instead of a string
+TIME_SERIES_SCHEMA = pa.schema([
+    ('datetime', pa.timestamp('ns')),
+    ('monitor', pa.int8()),
+    ('channel', pa.int8()),
+    ('reading', pa.dictionary(pa.int8(), pa.string())),
+    ('value', pa.int16())
+], metadata=CACHE_METADATA)
+
+# On-disk layout of the cached data/processed/fly_metadata.parquet
+FLY_METADATA_SCHEMA = pa.schema([
+    ('monitor', pa.int8()),
+    ('channel', pa.int8()),
+    ('fly_id', pa.string()),
+    ('genotype', pa.string()),
+    ('sex', pa.string()),
+    ('treatment', pa.string())
+], metadata=CACHE_METADATA)
+
+
+def is_cache_fresh(source_path, cache_path):
+    """
+    Check whether a cached output is newer than the file it was built from.
+    
+    Args:
+        source_path (str): Path to the source file
+        cache_path (str): Path to the cached output
+        
+    Returns:
+        bool: True if cache_path exists and is newer than source_path
+    """
+    return os.path.exists(cache_path) and os.path.getmtime(cache_path) > os.path.getmtime(source_path)
+
+
+def is_cache_valid(source_path, cache_path, schema):
+    """
+    Check whether a cached output is fresh and was written with the expected layout.
+    
+    Args:
+        source_path (str): Path to the source file
+        cache_path (str): Path to the cached output (.parquet or Arrow IPC .arrow)
+        schema (pa.Schema): Schema the cache must have
+        
+    Returns:
+        bool: True if the cache is newer than source_path, readable, matches schema
+            and carries the layout version of schema
+    """
+    if not is_cache_fresh(source_path, cache_path):
+        return False
+    try:
+        if cache_path.endswith('.parquet'):
+            cached_schema = pq.read_schema(cache_path)
+        else:
+            cached_schema = pa.ipc.open_file(pa.memory_map(cache_path)).schema
+    except (pa.ArrowInvalid, OSError):
+        return False
+    # equals() ignores metadata, so the layout version is compared separately
+    # (pandas adds its own metadata keys, hence only this key is checked)
+    key = b'create_database_layout'
+    return (cached_schema.equals(schema)
+            and (cached_schema.metadata or {}).get(key) == schema.metadata[key])
 
 
 def parse_details(filepath):
@@ -41,124 +123,326 @@ def parse_details(filepath):
     print(f"📋 Parsing metadata from {filepath}...")
     
     # Read the details file
-    df = pd.read_csv(filepath, sep='\t')
+    df = pd.read_csv(filepath, sep='\t', dtype={'Monitor': 'int8'})
     
-    # Clean up the data
-    df['monitor'] = df['Monitor'].astype(int)
-    df['channel'] = df['Channel'].str.replace('ch', '').astype(int)
+    # Clean up the data (small ints: at most a handful of monitors x 32 channels)
+    df['monitor'] = df['Monitor']
+    df['channel'] = df['Channel'].str.replace('ch', '').astype(np.int8)
     df['genotype'] = df['Genotype']
     df['sex'] = df['Sex']
     df['treatment'] = df['Treatment']
     
     # Create fly_id: M{monitor}_Ch{channel:02d}
-    df['fly_id'] = df.apply(lambda row: f"M{row['monitor']}_Ch{row['channel']:02d}", axis=1)
+    df['fly_id'] = 'M' + df['monitor'].astype(str) + '_Ch' + df['channel'].astype(str).str.zfill(2)
     
     # Select and reorder columns
-    fly_metadata = df[['monitor', 'channel', 'fly_id', 'genotype', 'sex', 'treatment']].copy()
+    fly_metadata = df[['monitor', 'channel', 'fly_id', 'genotype', 'sex', 'treatment']]
     
     # Remove rows with NA values (empty channels)
-    fly_metadata = fly_metadata[fly_metadata['genotype'] != 'NA'].copy()
+    fly_metadata = fly_metadata[fly_metadata['genotype'] != 'NA']
     
     print(f"✅ Parsed {len(fly_metadata)} flies from metadata")
-    print(f"   Monitors: {sorted(fly_metadata['monitor'].unique())}")
+    print(f"   Monitors: {sorted(fly_metadata['monitor'].unique().tolist())}")
     print(f"   Genotypes: {list(fly_metadata['genotype'].unique())}")
     print(f"   Treatments: {list(fly_metadata['treatment'].unique())}")
     
     return fly_metadata
 
 
-def parse_monitor_file(filepath, monitor_num):
+def scan_numbers(df_filtered):
+    """
+    Number the scans in monitor rows by file order.
+    
+    A scan is a run of consecutive rows with the same id and datetime. Ids
+    are not unique (the monitor's counter resets), and neither are datetimes
+    (DST fall-back, clock resets), so scans are told apart by position.
+    
+    Args:
+        df_filtered (pd.DataFrame): Monitor rows in file order with id and datetime columns
+        
+    Returns:
+        np.ndarray: scan number (0, 1, 2, ...) for every row
+    """
+    ids = df_filtered['id'].to_numpy()
+    times = df_filtered['datetime'].to_numpy()
+    new_scan = np.ones(len(df_filtered), dtype=bool)
+    new_scan[1:] = (ids[1:] != ids[:-1]) | (times[1:] != times[:-1])
+    return np.cumsum(new_scan) - 1
+
+
+def build_long_format(df_filtered, monitor_num):
+    """
+    Reshape MT/CT/Pn monitor rows into long format time-series records.
+    
+    Args:
+        df_filtered (pd.DataFrame): Monitor rows (MT, CT, Pn only) with
+            id, datetime, movement_type and ch1-ch32 columns
+        monitor_num (int): Monitor number (5 or 6)
+        
+    Returns:
+        pd.DataFrame: time-series records with columns:
+            datetime, monitor, channel, reading, value
+            (in file order of the scans, then by channel and reading)
+    """
+    movement_types = ['MT', 'CT', 'Pn']
+    channel_cols = [f'ch{i}' for i in range(1, 33)]
+    
+    # One row per scan: build an aligned (scans x 32 channels) matrix for each
+    # movement type (missing movement types stay 0). Scans are numbered in file
+    # order, so output follows the file and no scan is merged with another
+    scans = scan_numbers(df_filtered)
+    n_scans = scans[-1] + 1 if len(scans) else 0
+    new_scan = np.ones(len(scans), dtype=bool)
+    new_scan[1:] = scans[1:] != scans[:-1]
+    times = df_filtered['datetime'].to_numpy()[new_scan]
+    matrices = []
+    for movement_type in movement_types:
+        is_type = (df_filtered['movement_type'] == movement_type).to_numpy()
+        # Keep the first row of each movement type per scan
+        type_scans, first = np.unique(scans[is_type], return_index=True)
+        matrix = np.zeros((n_scans, len(channel_cols)), dtype=np.int16)
+        matrix[type_scans] = df_filtered.loc[is_type, channel_cols].to_numpy(dtype=np.int16)[first]
+        matrices.append(matrix)
+    mt_mat, ct_mat, pn_mat = matrices
+    
+    # Only include if at least one value is non-zero (active channel)
+    # One elementwise comparison per matrix; no per-row or per-channel Python work
+    active_mask = (mt_mat > 0) | (ct_mat > 0) | (pn_mat > 0)
+    row_idx, col_idx = np.nonzero(active_mask)
+    
+    # Create 3 rows per channel: one for each reading type, emitted in
+    # (CT, MT, Pn) order. Scans come out in file order and channels ascending
+    # within a scan, so while a monitor's timestamps keep increasing its rows
+    # are already in (datetime, channel, reading) order (see is_time_ordered)
+    reading_order = ['CT', 'MT', 'Pn']
+    values = np.column_stack([ct_mat[row_idx, col_idx], mt_mat[row_idx, col_idx], pn_mat[row_idx, col_idx]])
+    return pd.DataFrame({
+        'datetime': np.repeat(times[row_idx], len(movement_types)),
+        'monitor': np.int8(monitor_num),
+        'channel': np.repeat((col_idx + 1).astype(np.int8), len(movement_types)),
+        'reading': pd.Categorical.from_codes(np.tile(np.arange(len(reading_order), dtype=np.int8), len(row_idx)),
+                                             categories=reading_order),
+        'value': values.ravel()
+    })
+
+
+def parse_monitor_file(filepath, monitor_num, block_size=32 << 20):
     """
     Parse one Monitor*.txt file to extract time-series data in LONG format.
     
     Creates long format data where each timestamp has 3 rows per channel:
     - One row for MT, one for CT, one for Pn
     
+    The file is streamed through the PyArrow CSV reader in blocks, so peak
+    memory stays proportional to block_size rather than to the size of the
+    monitor file.
+    
     Args:
         filepath (str): Path to Monitor*.txt file
         monitor_num (int): Monitor number (5 or 6)
+        block_size (int): Number of bytes of the file to parse at a time
         
-    Returns:
-        pd.DataFrame: time_series_data with columns:
+    Yields:
+        pd.DataFrame: time-series records for one block, with columns:
             datetime, monitor, channel, reading, value
     """
     print(f"📊 Parsing time-series data from {filepath} (Monitor {monitor_num})...")
     
-    # Read the monitor file
-    df = pd.read_csv(filepath, sep='\t', header=None)
-    
     # Define column names based on the data structure
     # Columns: ID, date, time, port, [unknowns], movement_type, 0, 0, [32 channel values]
+    channel_cols = [f'ch{i}' for i in range(1, 33)]
     columns = ['id', 'date', 'time', 'port', 'unknown1', 'unknown2', 'unknown3', 'movement_type', 'zero1', 'zero2']
-    # Add 32 channel columns (channels 1-32)
-    for i in range(1, 33):
-        columns.append(f'ch{i}')
-    
-    df.columns = columns
+    columns += channel_cols
     
-    # Parse datetime
-    df['datetime'] = pd.to_datetime(df['date'] + ' ' + df['time'], format='%d %b %y %H:%M:%S')
-    
-    # Filter for the three movement types: MT, CT, Pn
+    # Only id, date, time, movement_type and the 32 channels are used, so only
+    # those columns are converted. id is the scan counter: it is what tells two
+    # scans apart when the clock repeats a time. movement_type is
+    # dictionary-encoded (a pandas categorical) so filtering compares small
+    # integer codes
     movement_types = ['MT', 'CT', 'Pn']
-    df_filtered = df[df['movement_type'].isin(movement_types)].copy()
-    
-    print(f"   Found {len(df_filtered)} rows with movement data")
-    print(f"   Date range: {df_filtered['datetime'].min()} to {df_filtered['datetime'].max()}")
-    print(f"   Movement types: {df_filtered['movement_type'].unique()}")
+    column_types = {'id': pa.int32(), 'date': pa.string(), 'time': pa.string(),
+                    'movement_type': pa.dictionary(pa.int32(), pa.string())}
+    # Channel counts fit int16 (max 32,767); the largest value in the current
+    # Monitor5/Monitor6 files is an MT count of 1,286
+    column_types.update({col: pa.int16() for col in channel_cols})
+    
+    reader = pacsv.open_csv(
+        filepath,
+        read_options=pacsv.ReadOptions(column_names=columns, block_size=block_size),
+        parse_options=pacsv.ParseOptions(delimiter='\t'),
+        convert_options=pacsv.ConvertOptions(include_columns=['id', 'date', 'time', 'movement_type'] + channel_cols,
+                                             column_types=column_types)
+    )
+    
+    carry = None
+    rows_found = 0
+    found_types = set()
+    min_datetime = None
+    max_datetime = None
+    
+    # Read the monitor file chunk by chunk
+    for batch in reader:
+        chunk = batch.to_pandas()
+        
+        # Parse datetime (date and time separately, avoiding a concatenated string column)
+        chunk['datetime'] = pd.to_datetime(chunk['date'], format='%d %b %y') + pd.to_timedelta(chunk['time'])
+        
+        # Filter for the three movement types: MT, CT, Pn
+        # (fixing the categories keeps them identical across chunks; any other
+        # movement type becomes NaN)
+        chunk['movement_type'] = chunk['movement_type'].cat.set_categories(movement_types)
+        df_filtered = chunk[chunk['movement_type'].notna()]
+        if len(df_filtered) == 0:
+            continue
+        
+        rows_found += len(df_filtered)
+        found_types.update(df_filtered['movement_type'].unique())
+        chunk_min, chunk_max = df_filtered['datetime'].min(), df_filtered['datetime'].max()
+        min_datetime = chunk_min if min_datetime is None else min(min_datetime, chunk_min)
+        max_datetime = chunk_max if max_datetime is None else max(max_datetime, chunk_max)
+        
+        if carry is not None:
+            df_filtered = pd.concat([carry, df_filtered])
+        
+        # The last scan's MT/CT/Pn rows may continue in the next chunk, so hold
+        # them back until that chunk has been read. Only the trailing run is
+        # held back: an earlier scan can share its id or datetime
+        scans = scan_numbers(df_filtered)
+        is_last = scans == scans[-1]
+        carry = df_filtered[is_last]
+        if not is_last.all():
+            yield build_long_format(df_filtered[~is_last], monitor_num)
+    
+    if carry is not None:
+        yield build_long_format(carry, monitor_num)
+    
+    print(f"   Monitor {monitor_num}: found {rows_found} rows with movement data")
+    print(f"   Date range: {min_datetime} to {max_datetime}")
+    print(f"   Movement types: {sorted(found_types)}")
+
+
+def write_monitor_arrow(filepath, monitor_num, output_path):
+    """
+    Parse one Monitor*.txt file and stream its time-series records to an
+    Arrow IPC file, one record batch per parsed block.
     
-    # Create long format data
-    # Each timestamp has 3 rows (MT, CT, Pn), we want one row per reading type per channel
-    time_series_list = []
+    The full time series is never held in memory; the resulting file can be
+    memory-mapped by consumers.
     
-    # Group by timestamp (id, date, time)
-    for (timestamp_id, date, time), group in df_filtered.groupby(['id', 'date', 'time']):
-        datetime_val = group['datetime'].iloc[0]
-        
-        # Get the three movement types for this timestamp
-        mt_data = group[group['movement_type'] == 'MT'].iloc[0] if 'MT' in group['movement_type'].values else None
-        ct_data = group[group['movement_type'] == 'CT'].iloc[0] if 'CT' in group['movement_type'].values else None
-        pn_data = group[group['movement_type'] == 'Pn'].iloc[0] if 'Pn' in group['movement_type'].values else None
+    Args:
+        filepath (str): Path to Monitor*.txt file
+        monitor_num (int): Monitor number (5 or 6)
+        output_path (str): Path of the .arrow file to write
         
-        # Extract channel values (columns 10-41, which are ch1-ch32)
-        for channel in range(1, 33):
-            channel_col = f'ch{channel}'
-            
-            # Get values for each movement type
-            mt_val = mt_data[channel_col] if mt_data is not None else 0
-            ct_val = ct_data[channel_col] if ct_data is not None else 0
-            pn_val = pn_data[channel_col] if pn_data is not None else 0
+    Returns:
+        str: output_path
+    """
+    total_records = 0
+    channels = set()
+    reading_types = []
+    min_datetime = None
+    max_datetime = None
+    
+    # Write to a temporary file and rename at the end, so an interrupted run
+    # never leaves a partial file that looks like a fresh cache
+    tmp_path = output_path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, TIME_SERIES_SCHEMA) as writer:
+        # Create long format data
+        # Each timestamp has 3 rows (MT, CT, Pn), we want one row per reading type per channel
+        for records in parse_monitor_file(filepath, monitor_num):
+            if len(records) == 0:
+                continue
+            writer.write_batch(pa.RecordBatch.from_pandas(records, schema=TIME_SERIES_SCHEMA, preserve_index=False))
             
-            # Only include if at least one value is non-zero (active channel)
-            if mt_val > 0 or ct_val > 0 or pn_val > 0:
-                # Create 3 rows per channel: one for each reading type
-                for reading, value in [('MT', mt_val), ('CT', ct_val), ('Pn', pn_val)]:
-                    time_series_list.append({
-                        'datetime': datetime_val,
-                        'monitor': monitor_num,
-                        'channel': channel,
-                        'reading': reading,
-                        'value': int(value)
-                    })
+            total_records += len(records)
+            channels.update(records['channel'].unique().tolist())
+            reading_types += [r for r in records['reading'].unique() if r not in reading_types]
+            # True min/max over all batches (a file can go back in time after a clock reset)
+            batch_min, batch_max = records['datetime'].min(), records['datetime'].max()
+            min_datetime = batch_min if min_datetime is None else min(min_datetime, batch_min)
+            max_datetime = batch_max if max_datetime is None else max(max_datetime, batch_max)
+    os.replace(tmp_path, output_path)
+    
+    print(f"✅ Created {total_records} time-series records for Monitor {monitor_num}")
+    print(f"   Channels with data: {sorted(channels)}")
+    print(f"   Date range: {min_datetime} to {max_datetime}")
+    print(f"   Reading types: {reading_types}")
+    print(f"💾 Streamed Monitor {monitor_num} time series to {output_path}")
+    
+    return output_path
+
+
+def is_time_ordered(monitor_table):
+    """
+    Check whether one monitor's time series is already in (datetime, channel, reading) order.
     
-    time_series_df = pd.DataFrame(time_series_list)
+    Args:
+        monitor_table (pa.Table): Rows of a single monitor, as written by write_monitor_arrow
+        
+    Returns:
+        bool: True if every (datetime, channel) cell comes strictly after the previous one
+    """
+    # build_long_format emits each cell as a CT/MT/Pn triple, so checking the
+    # first row of every triple is enough. This fails when a monitor repeats
+    # a wall-clock time (DST fall-back, clock reset) and two scans overlap
+    times = monitor_table.column('datetime').to_numpy()[::3]
+    channels = monitor_table.column('channel').to_numpy()[::3]
+    later = times[1:] > times[:-1]
+    same_time = times[1:] == times[:-1]
+    return bool(np.all(later | (same_time & (channels[1:] > channels[:-1]))))
+
+
+def attach_fly_metadata(time_series_data, fly_metadata):
+    """
+    Attach fly metadata to every time-series row by (monitor, channel).
     
-    print(f"✅ Created {len(time_series_df)} time-series records for Monitor {monitor_num}")
-    print(f"   Channels with data: {list(time_series_df['channel'].unique())}")
-    print(f"   Date range: {time_series_df['datetime'].min()} to {time_series_df['datetime'].max()}")
-    print(f"   Reading types: {list(time_series_df['reading'].unique())}")
+    Equivalent to an inner merge on (monitor, channel), but done as a lookup:
+    a dense (monitor x channel) array holds each fly's metadata row position,
+    so every time-series row is matched by direct indexing and the metadata
+    columns are gathered with take. Rows without metadata are dropped.
     
-    return time_series_df
+    Args:
+        time_series_data (pd.DataFrame): Time-series records with monitor and channel columns
+        fly_metadata (pd.DataFrame): One row per fly, from parse_details
+        
+    Returns:
+        pd.DataFrame: time_series_data columns followed by the metadata columns
+    """
+    if fly_metadata.duplicated(['monitor', 'channel']).any():
+        raise ValueError("fly metadata has more than one row for some (monitor, channel)")
+    
+    ts_monitor = time_series_data['monitor'].to_numpy()
+    ts_channel = time_series_data['channel'].to_numpy()
+    meta_monitor = fly_metadata['monitor'].to_numpy()
+    meta_channel = fly_metadata['channel'].to_numpy()
+    
+    # positions[monitor, channel] = metadata row of that fly, or -1 if none
+    positions = np.full((max(ts_monitor.max(), meta_monitor.max()) + 1,
+                         max(ts_channel.max(), meta_channel.max()) + 1), -1, dtype=np.int32)
+    positions[meta_monitor, meta_channel] = np.arange(len(fly_metadata), dtype=np.int32)
+    
+    meta_rows = positions[ts_monitor, ts_channel]
+    matched = meta_rows >= 0
+    
+    merged_data = time_series_data[matched].reset_index(drop=True)
+    meta_columns = fly_metadata.drop(columns=['monitor', 'channel'])
+    meta_columns = meta_columns.take(meta_rows[matched]).reset_index(drop=True)
+    return pd.concat([merged_data, meta_columns], axis=1)
 
 
-def main():
+def main(demo=False):
     """
     Main function to create the single merged database in LONG format.
     
-    Creates one CSV file:
-    data/processed/dam_data_merged.csv - Complete merged data with all information
+    Creates:
+    data/processed/fly_metadata.parquet - Parsed details.txt
+    data/processed/time_series_M5.arrow, time_series_M6.arrow - Per-monitor time series (Arrow IPC)
+    data/processed/dam_data_merged.parquet - Complete merged data with all information
     
     Structure: datetime, monitor, channel, reading, value, fly_id, genotype, sex, treatment
+    
+    Args:
+        demo (bool): If True, also print example rows from the merged data
     """
     print("🚀 Starting Fly Sleep Behavior Database Creation")
     print("=" * 60)
@@ -170,28 +454,71 @@ def main():
     print("\n📋 PART 1: Parsing fly metadata")
     print("-" * 40)
     
-    fly_metadata = parse_details('../../details.txt')
+    # Reuse the cached metadata if details.txt has not changed since it was written
+    details_path = '../../details.txt'
+    metadata_cache_path = '../../data/processed/fly_metadata.parquet'
+    if is_cache_valid(details_path, metadata_cache_path, FLY_METADATA_SCHEMA):
+        print(f"♻️  Using cached metadata from {metadata_cache_path}")
+        fly_metadata = pd.read_parquet(metadata_cache_path)
+    else:
+        fly_metadata = parse_details(details_path)
+        # Write to a temporary file and rename, like the Arrow caches, so an
+        # interrupted write never leaves a partial file that looks fresh
+        tmp_path = metadata_cache_path + '.tmp'
+        pq.write_table(pa.Table.from_pandas(fly_metadata, schema=FLY_METADATA_SCHEMA, preserve_index=False), tmp_path)
+        os.replace(tmp_path, metadata_cache_path)
     
     # PART 2: Parse time-series data in long format
     print("\n📊 PART 2: Parsing time-series data in long format")
     print("-" * 40)
     
-    # Parse both monitor files
-    monitor5_data = parse_monitor_file('../../Monitor5.txt', 5)
-    monitor6_data = parse_monitor_file('../../Monitor6.txt', 6)
-    
-    # Combine into single time-series table
-    time_series_data = pd.concat([monitor5_data, monitor6_data], ignore_index=True)
+    # Parse both monitor files, streaming each to its own Arrow IPC file
+    # The files are independent, so they are parsed in parallel worker processes
+    monitor_files = ['../../Monitor5.txt', '../../Monitor6.txt']
+    monitor_nums = [5, 6]
+    arrow_paths = [f'../../data/processed/time_series_M{num}.arrow' for num in monitor_nums]
+    
+    # Only reparse monitor files that changed since their Arrow file was written
+    # (files written with an older layout are reparsed too)
+    stale = []
+    for monitor_file, monitor_num, arrow_path in zip(monitor_files, monitor_nums, arrow_paths):
+        if is_cache_valid(monitor_file, arrow_path, TIME_SERIES_SCHEMA):
+            print(f"♻️  Using cached Monitor {monitor_num} time series from {arrow_path}")
+        else:
+            stale.append((monitor_file, monitor_num, arrow_path))
+    
+    if stale:
+        with ProcessPoolExecutor(max_workers=len(stale)) as executor:
+            list(executor.map(write_monitor_arrow, *zip(*stale)))
+    
+    # Combine into single time-series table (memory-mapped, no copy until the sort)
+    monitor_tables = [pa.ipc.open_file(pa.memory_map(path)).read_all() for path in arrow_paths]
+    time_series_table = pa.concat_tables(monitor_tables)
     
     # Sort by datetime for better organization
-    time_series_data = time_series_data.sort_values(['datetime', 'monitor', 'channel', 'reading']).reset_index(drop=True)
+    if all(is_time_ordered(table) for table in monitor_tables):
+        # Each monitor is already ordered by channel and reading within a
+        # datetime, and monitors are concatenated in ascending order, so a
+        # stable sort on datetime alone gives the full order
+        time_series_data = time_series_table.sort_by('datetime').to_pandas()
+    else:
+        # A monitor repeats a wall-clock time, so the rows of the overlapping
+        # scans must interleave by channel and reading. Arrow cannot sort
+        # dictionary columns, so reading is sorted through a temporary string copy
+        time_series_table = time_series_table.append_column(
+            'reading_key', pc.cast(time_series_table.column('reading'), pa.string())
+        )
+        time_series_data = time_series_table.sort_by([
+            ('datetime', 'ascending'), ('monitor', 'ascending'),
+            ('channel', 'ascending'), ('reading_key', 'ascending')
+        ]).drop_columns(['reading_key']).to_pandas()
     
     # PART 3: Merge with metadata
     print("\n🔗 PART 3: Merging with fly metadata")
     print("-" * 40)
     
     # Merge time-series data with metadata using (monitor, channel)
-    merged_data = time_series_data.merge(fly_metadata, on=['monitor', 'channel'])
+    merged_data = attach_fly_metadata(time_series_data, fly_metadata)
     
     # Add LIKELY_DEAD column (default = False)
     # This column will be updated by mark_dead_flies.py to identify flies that die
@@ -202,17 +529,23 @@ def main():
     merged_data = merged_data[final_columns]
     
     # Save merged data
-    merged_path = '../../data/processed/dam_data_merged.csv'
-    merged_data.to_csv(merged_path, index=False)
+    merged_path = '../../data/processed/dam_data_merged.parquet'
+    merged_data.to_parquet(merged_path, engine='pyarrow', compression='zstd',
+                           row_group_size=200_000, index=False)
     print(f"💾 Saved merged data to {merged_path}")
     
     # PART 4: Validation and Summary
     print("\n📈 PART 4: Validation and Summary")
     print("-" * 40)
     
+    # Per-fly counts come from the (monitor, channel) row counts joined to the
+    # metadata (one row per fly), not from a pass over the merged fly_id strings
+    fly_counts = time_series_data.groupby(['monitor', 'channel']).size().reset_index(name='rows')
+    fly_counts = fly_counts.merge(fly_metadata, on=['monitor', 'channel'])
+    
     print(f"Total rows: {len(merged_data):,}")
     print(f"Unique timestamps: {merged_data['datetime'].nunique():,}")
-    print(f"Unique flies: {merged_data['fly_id'].nunique()}")
+    print(f"Unique flies: {fly_counts['fly_id'].nunique()}")
     print(f"Date range: {merged_data['datetime'].min()} to {merged_data['datetime'].max()}")
     print(f"File size: {os.path.getsize(merged_path) / (1024*1024):.1f} MB")
     
@@ -222,28 +555,29 @@ def main():
         print(f"  {reading}: {count:,} rows")
     
     print(f"\nUnique flies per monitor:")
-    flies_per_monitor = merged_data.groupby('monitor')['fly_id'].nunique()
+    flies_per_monitor = fly_counts.groupby('monitor')['fly_id'].nunique()
     for monitor, count in flies_per_monitor.items():
         print(f"  Monitor {monitor}: {count} flies")
     
-    # Show example data for one fly at one timestamp
-    print(f"\nExample data - All three reading types for one fly at one timestamp:")
-    example_fly = merged_data['fly_id'].iloc[0]
-    example_timestamp = merged_data['datetime'].iloc[0]
-    example_data = merged_data[
-        (merged_data['fly_id'] == example_fly) & 
-        (merged_data['datetime'] == example_timestamp)
-    ].sort_values('reading')
-    print(example_data[['datetime', 'monitor', 'channel', 'reading', 'value', 'fly_id', 'genotype', 'sex', 'treatment']])
+    # Show example data for one fly at one timestamp (demo only: scans the full merged table)
+    if demo:
+        print(f"\nExample data - All three reading types for one fly at one timestamp:")
+        example_fly = merged_data['fly_id'].iloc[0]
+        example_timestamp = merged_data['datetime'].iloc[0]
+        example_data = merged_data[
+            (merged_data['fly_id'] == example_fly) & 
+            (merged_data['datetime'] == example_timestamp)
+        ].sort_values('reading')
+        print(example_data[['datetime', 'monitor', 'channel', 'reading', 'value', 'fly_id', 'genotype', 'sex', 'treatment']])
     
     print(f"\n✅ Database creation complete!")
     print(f"   File created: {merged_path}")
     print(f"\n💡 To use in analysis:")
-    print(f"   data = pd.read_csv('{merged_path}')")
+    print(f"   data = pd.read_parquet('{merged_path}')")
     print(f"   # Filter by reading type: data[data['reading'] == 'MT']")
     print(f"   # Filter by genotype: data[data['genotype'] == 'SSS']")
     print(f"   # Group by fly: data.groupby('fly_id')")
 
 
 if __name__ == "__main__":
-    main()
+    main(demo='--demo' in sys.argv[1:])
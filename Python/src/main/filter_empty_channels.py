@@ -17,7 +17,7 @@ def filter_empty_channels(input_file, output_file):
     Filter out empty channels (channels without actual flies).
     
     Args:
-        input_file (str): Path to dam_data_merged.csv
+        input_file (str): Path to dam_data_merged.parquet
         output_file (str): Path to save dam_data_with_flies.csv
     """
     print("=" * 60)
@@ -33,8 +33,7 @@ def filter_empty_channels(input_file, output_file):
     print(f"\n📂 Loading data from: {os.path.basename(input_file)}")
     
     # Load the merged data
-    df = pd.read_csv(input_file)
-    df['datetime'] = pd.to_datetime(df['datetime'])
+    df = pd.read_parquet(input_file)
     
     print(f"   Total rows: {len(df):,}")
     print(f"   Unique channels: {len(df.groupby(['monitor', 'channel']).size())}")
@@ -96,7 +95,7 @@ def main():
     """
     Main function to filter empty channels.
     """
-    input_file = '../../data/processed/dam_data_merged.csv'
+    input_file = '../../data/processed/dam_data_merged.parquet'
     output_file = '../../data/processed/dam_data_with_flies.csv'
     
     # Ensure output directory exists
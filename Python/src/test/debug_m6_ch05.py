@@ -8,8 +8,7 @@ from datetime import datetime, timedelta
 
 def debug_fly_death(fly_id):
     # Load data
-    dam_data = pd.read_csv('../../data/processed/dam_data_merged.csv')
-    dam_data['datetime'] = pd.to_datetime(dam_data['datetime'])
+    dam_data = pd.read_parquet('../../data/processed/dam_data_merged.parquet')
     
     # Get MT data for this fly
     fly_data = dam_data[dam_data['fly_id'] == fly_id]
@@ -97,7 +97,7 @@ def create_death_report(dam_data):
     Create a report of all flies that died during the experiment.
     
     Args:
-        dam_data (pd.DataFrame): Full dam_data_merged.csv
+        dam_data (pd.DataFrame): Full dam_data_merged.parquet
         
     Returns:
         pd.DataFrame: Death report with columns:
@@ -159,7 +159,7 @@ def filter_dead_flies(dam_data, death_report):
     Filter out ALL data from dead flies (both before and after death time).
     
     Args:
-        dam_data (pd.DataFrame): Full dam_data_merged.csv
+        dam_data (pd.DataFrame): Full dam_data_merged.parquet
         death_report (pd.DataFrame): Death report from create_death_report
         
     Returns:
@@ -208,15 +208,14 @@ def main():
     
     # Load the merged data
     print("\n📂 Loading data...")
-    data_path = '../../data/processed/dam_data_merged.csv'
+    data_path = '../../data/processed/dam_data_merged.parquet'
     
     if not os.path.exists(data_path):
         print(f"❌ Error: {data_path} not found!")
         print("   Please run create_database.py first to generate the merged data.")
         sys.exit(1)
     
-    dam_data = pd.read_csv(data_path)
-    dam_data['datetime'] = pd.to_datetime(dam_data['datetime'])
+    dam_data = pd.read_parquet(data_path)
     
     print(f"   Loaded {len(dam_data):,} rows for {dam_data['fly_id'].nunique()} flies")
     
@@ -124,8 +124,7 @@ def main():
     
     # Load data
     print("📂 Loading data...")
-    dam_data = pd.read_csv('../../data/processed/dam_data_merged.csv')
-    dam_data['datetime'] = pd.to_datetime(dam_data['datetime'])
+    dam_data = pd.read_parquet('../../data/processed/dam_data_merged.parquet')
     
     death_report = pd.read_csv('../../data/processed/dead_flies_report.csv')
     death_report['time_of_death'] = pd.to_datetime(death_report['time_of_death'])